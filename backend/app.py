@@ -1,20 +1,51 @@
 """FastAPI application for stock MA monitoring."""
 
+import logging
 import time
+from contextlib import asynccontextmanager
+import orjson
 from fastapi import FastAPI, Query
 from fastapi.middleware.cors import CORSMiddleware
-from typing import List, Optional
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from pydantic import TypeAdapter
+from typing import AsyncIterator, List, Optional, Tuple
 
-from models.stock_models import StockResponse, Statistics, TickersResponse
+from models.stock_frame import StockFrame
+from models.stock_models import StockData, StockResponse, Statistics, TickersResponse
 from services.parallel_processor import ParallelStockProcessor
-from utils.sp500_fetcher import get_sp500_tickers
+from utils.sp500_fetcher import get_sp500_tickers_async, get_sp500_tickers_with_status_async
 from utils.cache import stock_cache
+from utils.market_hours import stocks_ttl
+
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+# httpx logs every request at INFO, which is one line per ticker on a full sweep
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
+# Newer FastAPI serializes response models straight to JSON and deprecates ORJSONResponse;
+# its fast path only applies while the default response class is left unset
+response_class_options = (
+    {} if getattr(ORJSONResponse, "__deprecated__", None)
+    else {"default_response_class": ORJSONResponse}
+)
+
+# Initialize parallel processor
+processor = ParallelStockProcessor(max_concurrent_requests=20)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Close the processor's shared HTTP client on shutdown."""
+    yield
+    await processor.aclose()
 
 
 app = FastAPI(
     title="Stock MA Monitor API",
     description="API for monitoring stocks and their distance from 150-day moving average",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
+    **response_class_options
 )
 
 # Configure CORS for local development
@@ -26,8 +57,49 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize parallel processor
-processor = ParallelStockProcessor(max_workers=10, batch_size=50)
+# Ticker list cache TTLs in seconds (stock data uses stocks_ttl())
+TICKERS_TTL = 86400
+TICKERS_FALLBACK_TTL = 3600  # Retry Wikipedia sooner when only the custom list was available
+
+
+# Bulk validator for converting cached rows into response models
+stock_list_adapter = TypeAdapter(List[StockData])
+
+
+def cache_stocks(cache_key: str, frame: StockFrame) -> List[StockData]:
+    """
+    Cache a fetched frame together with its validated response models.
+
+    Args:
+        cache_key: Stock data cache key
+        frame: Columns of the freshly fetched stock data
+
+    Returns:
+        StockData models in frame order, validated once for all later cache hits
+    """
+    stocks = stock_list_adapter.validate_python(frame.to_rows())
+    stock_cache.set(cache_key, (frame, stocks), ttl=stocks_ttl())
+    return stocks
+
+
+def parse_custom_tickers(include_custom: Optional[str]) -> Tuple[str, ...]:
+    """Normalize custom tickers so case, order and whitespace share one cache entry."""
+    return tuple(sorted({
+        t.strip().upper() for t in (include_custom or '').split(',') if t.strip()
+    }))
+
+
+def stocks_cache_key(custom_tickers: Tuple[str, ...]) -> str:
+    """Build the stock data cache key for a normalized custom ticker tuple."""
+    return f"stocks_{','.join(custom_tickers) or 'default'}"
+
+
+async def build_ticker_list(custom_tickers: Tuple[str, ...]) -> List[str]:
+    """Get the S&P 500 ticker list extended with any custom tickers."""
+    tickers = list(await get_sp500_tickers_async())
+    known_tickers = set(tickers)
+    tickers.extend(t for t in custom_tickers if t not in known_tickers)
+    return tickers
 
 
 @app.get("/")
@@ -64,10 +136,10 @@ async def get_tickers():
         )
 
     # Fetch fresh data
-    tickers = get_sp500_tickers()
+    tickers, complete = await get_sp500_tickers_with_status_async()
 
     # Cache the result
-    stock_cache.set(cache_key, tickers)
+    stock_cache.set(cache_key, tickers, ttl=TICKERS_TTL if complete else TICKERS_FALLBACK_TTL)
 
     return TickersResponse(
         tickers=tickers,
@@ -88,45 +160,70 @@ async def get_stocks(
     Returns:
         StockResponse with all stock data
     """
-    # Build cache key
-    cache_key = f"stocks_{include_custom or 'default'}"
+    custom_tickers = parse_custom_tickers(include_custom)
+    cache_key = stocks_cache_key(custom_tickers)
 
     # Check cache first
-    cached_data = stock_cache.get(cache_key)
-    if cached_data:
+    _, stocks = stock_cache.get(cache_key) or (None, None)
+    if stocks:
         return StockResponse(
-            stocks=cached_data,
-            total_count=len(cached_data),
+            stocks=stocks,
+            total_count=len(stocks),
             processing_time=0.0,
             cache_hit=True
         )
 
-    # Get base ticker list
-    tickers = get_sp500_tickers()
-
-    # Add custom tickers if provided
-    if include_custom:
-        custom_tickers = [t.strip().upper() for t in include_custom.split(',') if t.strip()]
-        for ticker in custom_tickers:
-            if ticker not in tickers:
-                tickers.append(ticker)
-
-    # Fetch stock data in parallel
+    # Fetch stock data concurrently
     start_time = time.time()
-    stocks_data = processor.fetch_stocks_parallel(tickers)
+    stocks_data = await processor.fetch_stocks_async(await build_ticker_list(custom_tickers))
     processing_time = time.time() - start_time
 
-    # Cache the result
-    stock_cache.set(cache_key, stocks_data)
+    # Cache the result as columns plus response models
+    stocks = cache_stocks(cache_key, StockFrame.from_records(stocks_data))
 
     return StockResponse(
-        stocks=stocks_data,
-        total_count=len(stocks_data),
+        stocks=stocks,
+        total_count=len(stocks),
         processing_time=round(processing_time, 2),
         cache_hit=False
     )
 
 
+@app.get("/api/stocks/stream")
+async def stream_stocks(
+    include_custom: Optional[str] = Query(None, description="Comma-separated custom tickers to include")
+):
+    """
+    Stream stock data as a JSON array, emitting each stock as soon as it is fetched.
+
+    Args:
+        include_custom: Optional comma-separated list of custom tickers (e.g., "NVDA,AMD,GOOGL")
+
+    Returns:
+        StreamingResponse with a JSON array of stock data
+    """
+    custom_tickers = parse_custom_tickers(include_custom)
+    cache_key = stocks_cache_key(custom_tickers)
+    cached_frame, _ = stock_cache.get(cache_key) or (None, None)
+
+    async def generate() -> AsyncIterator[bytes]:
+        yield b'['
+        if cached_frame:
+            for i, row in enumerate(cached_frame.to_rows()):
+                yield (b',' if i else b'') + orjson.dumps(row)
+        else:
+            stocks_data = []
+            async for stock in processor.iter_stocks_async(await build_ticker_list(custom_tickers)):
+                yield (b',' if stocks_data else b'') + orjson.dumps(stock)
+                stocks_data.append(stock)
+
+            # Cache the completed result so /api/stocks can reuse it
+            cache_stocks(cache_key, StockFrame.from_records(stocks_data))
+        yield b']'
+
+    return StreamingResponse(generate(), media_type="application/json")
+
+
 @app.get("/api/statistics", response_model=Statistics)
 async def get_statistics(
     tickers: Optional[str] = Query(None, description="Comma-separated tickers to analyze")
@@ -142,25 +239,25 @@ async def get_statistics(
     """
     # If no specific tickers provided, use cached stock data
     if not tickers:
-        cache_key = "stocks_default"
-        cached_data = stock_cache.get(cache_key)
+        cache_key = stocks_cache_key(())
+        frame, _ = stock_cache.get(cache_key) or (None, None)
 
-        if not cached_data:
+        if not frame:
             # No cached data, fetch it
-            stocks_data = processor.fetch_stocks_parallel(get_sp500_tickers())
-            stock_cache.set(cache_key, stocks_data)
-        else:
-            stocks_data = cached_data
+            frame = StockFrame.from_records(
+                await processor.fetch_stocks_async(await get_sp500_tickers_async())
+            )
+            cache_stocks(cache_key, frame)
     else:
         # Fetch specific tickers
         ticker_list = [t.strip().upper() for t in tickers.split(',') if t.strip()]
-        stocks_data = processor.fetch_stocks_parallel(ticker_list)
+        frame = StockFrame.from_records(await processor.fetch_stocks_async(ticker_list))
 
-    # Calculate statistics
-    total_tickers = len(stocks_data)
-    near_ma_count = sum(1 for s in stocks_data if s.near_ma)
-    above_count = sum(1 for s in stocks_data if s.direction == "ABOVE")
-    below_count = sum(1 for s in stocks_data if s.direction == "BELOW")
+    # Calculate statistics on the columns
+    total_tickers = len(frame)
+    near_ma_count = int(frame.near.sum())
+    above_count = int(frame.above.sum())
+    below_count = total_tickers - above_count
 
     return Statistics(
         total_tickers=total_tickers,
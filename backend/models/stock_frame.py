@@ -0,0 +1,65 @@
+"""Columnar container for cached stock data."""
+
+from dataclasses import dataclass
+from typing import List
+
+import numpy as np
+
+from models.stock_record import StockRecord
+
+
+@dataclass
+class StockFrame:
+    """Stock data stored as parallel NumPy columns (one entry per ticker)."""
+    symbols: np.ndarray   # object array of ticker symbols
+    price: np.ndarray     # float64, rounded to 2 decimals
+    ma: np.ndarray        # float64, rounded to 2 decimals
+    diff_pct: np.ndarray  # float64, rounded to 2 decimals
+    above: np.ndarray     # bool, True if price is above the MA
+    near: np.ndarray      # bool, True if within 5% of the MA
+
+    @classmethod
+    def from_records(cls, stocks: List[StockRecord]) -> "StockFrame":
+        """
+        Build a StockFrame from StockRecord objects.
+
+        Args:
+            stocks: List of StockRecord objects
+
+        Returns:
+            StockFrame with one column per StockRecord field
+        """
+        return cls(
+            symbols=np.array([s.symbol for s in stocks], dtype=object),
+            price=np.array([s.price for s in stocks], dtype=np.float64),
+            ma=np.array([s.ma_150 for s in stocks], dtype=np.float64),
+            diff_pct=np.array([s.distance_percent for s in stocks], dtype=np.float64),
+            above=np.array([s.direction == "ABOVE" for s in stocks], dtype=bool),
+            near=np.array([s.near_ma for s in stocks], dtype=bool)
+        )
+
+    def __len__(self) -> int:
+        return len(self.symbols)
+
+    def to_rows(self) -> List[dict]:
+        """
+        Build one plain dict per ticker straight from the columns.
+
+        Returns:
+            List of dicts with the StockRecord fields, in frame order
+        """
+        return [
+            {
+                "symbol": symbol,
+                "price": price,
+                "ma_150": ma,
+                "distance_percent": diff,
+                "distance_abs": abs(diff),
+                "direction": "ABOVE" if above else "BELOW",
+                "near_ma": near
+            }
+            for symbol, price, ma, diff, above, near in zip(
+                self.symbols.tolist(), self.price.tolist(), self.ma.tolist(),
+                self.diff_pct.tolist(), self.above.tolist(), self.near.tolist()
+            )
+        ]
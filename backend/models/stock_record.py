@@ -0,0 +1,15 @@
+"""Lightweight per-stock record used inside the fetch pipeline."""
+
+from dataclasses import dataclass
+
+
+@dataclass(slots=True)
+class StockRecord:
+    """Internal stock data record (converted to StockData at the API boundary)."""
+    symbol: str
+    price: float
+    ma_150: float
+    distance_percent: float
+    distance_abs: float
+    direction: str  # "ABOVE" or "BELOW"
+    near_ma: bool   # True if within 5% of MA
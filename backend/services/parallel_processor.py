@@ -1,82 +1,149 @@
-"""Parallel stock data processor using ThreadPoolExecutor."""
+"""Concurrent stock data processor using asyncio and httpx."""
 
-import time
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from typing import List
-from models.stock_models import StockData
-from services.stock_service import get_stock_ma_data
+import asyncio
+import logging
+from typing import AsyncIterator, List, Optional
+import httpx
+import numpy as np
+import pandas as pd
+from models.stock_record import StockRecord
+from services.stock_service import build_stock_data, is_rate_limited, yahoo_limiter
+from utils.history_cache import history_cache
+from utils.market_hours import stocks_ttl
+
+
+logger = logging.getLogger(__name__)
+
+YAHOO_CHART_URL = "https://query1.finance.yahoo.com/v8/finance/chart/{symbol}"
+YAHOO_HEADERS = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'}
+# 1 year of daily bars covers the 150 trading days the MA needs
+YAHOO_CHART_RANGE = '1y'
 
 
 class ParallelStockProcessor:
-    """Process stock data in parallel using ThreadPoolExecutor."""
+    """Process stock data concurrently with asyncio and a shared httpx client."""
 
-    def __init__(self, max_workers: int = 10, batch_size: int = 50):
+    def __init__(self, max_concurrent_requests: int = 20):
         """
         Initialize parallel processor.
 
         Args:
-            max_workers: Number of parallel workers (default: 10)
-            batch_size: Number of stocks to process before rate limiting pause (default: 50)
+            max_concurrent_requests: Chart requests in flight at once (default: 20)
         """
-        self.max_workers = max_workers
-        self.batch_size = batch_size
-
-    def fetch_stocks_parallel(self, tickers: List[str]) -> List[StockData]:
+        self.max_concurrent_requests = max_concurrent_requests
+        self._client: Optional[httpx.AsyncClient] = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        """Get the shared HTTP client, creating it on first use so sweeps reuse connections."""
+        if self._client is None or self._client.is_closed:
+            limits = httpx.Limits(max_connections=self.max_concurrent_requests)
+            # Semaphores bound pool use, so only network waits need a timeout
+            timeout = httpx.Timeout(10.0, pool=None)
+            self._client = httpx.AsyncClient(
+                http2=True, limits=limits, headers=YAHOO_HEADERS, timeout=timeout
+            )
+        return self._client
+
+    async def fetch_stocks_async(self, tickers: List[str], ma_period: int = 150) -> List[StockRecord]:
         """
-        Fetch stock data in parallel using ThreadPoolExecutor.
+        Fetch stock data concurrently from Yahoo's chart API on the event loop.
 
         Args:
             tickers: List of stock ticker symbols
+            ma_period: Moving average period (default: 150 days)
 
         Returns:
-            List of StockData objects (excludes failed fetches)
+            List of StockRecord objects (excludes failed fetches)
         """
-        stocks_data = []
-        total_tickers = len(tickers)
-
-        # Process in batches for rate limiting
-        for batch_start in range(0, total_tickers, self.batch_size):
-            batch_end = min(batch_start + self.batch_size, total_tickers)
-            batch = tickers[batch_start:batch_end]
-
-            print(f"Processing batch {batch_start//self.batch_size + 1}: "
-                  f"Tickers {batch_start+1}-{batch_end} of {total_tickers}")
-
-            # Use ThreadPoolExecutor for parallel processing
-            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-                # Submit all tasks in the batch
-                future_to_ticker = {
-                    executor.submit(get_stock_ma_data, ticker): ticker
-                    for ticker in batch
-                }
-
-                # Collect results as they complete
-                for future in as_completed(future_to_ticker):
-                    ticker = future_to_ticker[future]
-                    try:
-                        result = future.result()
-                        if result:
-                            stocks_data.append(result)
-                    except Exception as e:
-                        print(f"Error processing {ticker}: {e}")
-
-            # Rate limiting: sleep 1 second after each batch
-            if batch_end < total_tickers:
-                print(f"Rate limiting: sleeping 1 second before next batch...")
-                time.sleep(1)
-
-        print(f"Completed processing {len(stocks_data)} stocks successfully "
-              f"out of {total_tickers} total")
+        stocks_data = [stock async for stock in self.iter_stocks_async(tickers, ma_period)]
+        logger.info("Completed processing %d stocks successfully out of %d total",
+                    len(stocks_data), len(tickers))
         return stocks_data
 
-    def fetch_single_stock(self, symbol: str) -> StockData:
+    async def iter_stocks_async(
+        self, tickers: List[str], ma_period: int = 150
+    ) -> AsyncIterator[StockRecord]:
+        """
+        Yield stock data from Yahoo's chart API in completion order.
+
+        Requests go through the shared history cache and rate limiter, and at
+        most max_concurrent_requests are in flight at once.
+
+        Args:
+            tickers: List of stock ticker symbols
+            ma_period: Moving average period (default: 150 days)
+
+        Yields:
+            StockRecord objects as their requests finish (failed fetches are skipped)
+        """
+        client = self._get_client()
+        semaphore = asyncio.Semaphore(self.max_concurrent_requests)
+        tasks = [
+            asyncio.ensure_future(self._fetch_chart(client, semaphore, ticker, ma_period))
+            for ticker in tickers
+        ]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                result = await next_done
+                if result:
+                    yield result
+        finally:
+            # Cancel outstanding requests if the consumer stops early
+            for task in tasks:
+                task.cancel()
+
+    async def _fetch_chart(
+        self, client: httpx.AsyncClient, semaphore: asyncio.Semaphore, symbol: str, ma_period: int
+    ) -> Optional[StockRecord]:
         """
-        Fetch data for a single stock (wrapper for compatibility).
+        Fetch one symbol's daily chart and calculate distance from its MA.
 
         Args:
+            client: Shared async HTTP client
+            semaphore: Bounds the number of requests in flight
             symbol: Stock ticker symbol
+            ma_period: Moving average period
 
         Returns:
-            StockData object or None
+            StockRecord object or None if error
         """
-        return get_stock_ma_data(symbol)
+        try:
+            # Expire with the in-memory stock cache so trading-hours prices stay fresh
+            close_df = await asyncio.to_thread(
+                history_cache.get, [symbol], YAHOO_CHART_RANGE, stocks_ttl()
+            )
+
+            if close_df is None:
+                async with semaphore:
+                    await yahoo_limiter.acquire_async()
+                    response = await client.get(
+                        YAHOO_CHART_URL.format(symbol=symbol),
+                        params={'range': YAHOO_CHART_RANGE, 'interval': '1d'}
+                    )
+                response.raise_for_status()
+
+                result = response.json()['chart']['result'][0]
+                close_df = pd.DataFrame(
+                    {symbol: np.array(result['indicators']['adjclose'][0]['adjclose'], dtype=np.float64)},
+                    index=pd.to_datetime(result['timestamp'], unit='s')
+                )
+                await asyncio.to_thread(history_cache.set, [symbol], YAHOO_CHART_RANGE, close_df)
+
+            closes = close_df[symbol].dropna().to_numpy()
+
+            if len(closes) < ma_period:
+                return None
+
+            current_ma = closes[-ma_period:].mean()
+            return build_stock_data(symbol, float(closes[-1]), float(current_ma))
+        except Exception as e:
+            if is_rate_limited(e):
+                yahoo_limiter.backoff()
+            logger.warning("Error fetching data for %s: %s", symbol, e)
+            return None
+
+    async def aclose(self) -> None:
+        """Close the shared HTTP client (a later sweep opens a new one)."""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
@@ -1,48 +1,59 @@
 """Stock data fetching and MA calculation service."""
 
-import yfinance as yf
-from typing import Optional
-from models.stock_models import StockData
+import logging
+from models.stock_record import StockRecord
+from utils.rate_limiter import RateLimiter
 
 
-def get_stock_ma_data(symbol: str, ma_period: int = 150) -> Optional[StockData]:
+logger = logging.getLogger(__name__)
+
+# Shared pacing for all Yahoo Finance requests made by this process (only throttles after a 429)
+yahoo_limiter = RateLimiter(max_calls=300, period=60)
+
+
+def is_rate_limited(error: Exception) -> bool:
+    """
+    Check whether an exception was caused by a Yahoo Finance 429 response.
+
+    Args:
+        error: Exception raised while fetching data
+
+    Returns:
+        True if the error indicates rate limiting
+    """
+    response = getattr(error, 'response', None)
+    if getattr(response, 'status_code', None) == 429:
+        return True
+    return type(error).__name__ == 'YFRateLimitError' or 'Too Many Requests' in str(error)
+
+
+def build_stock_data(symbol: str, current_price: float, current_ma: float) -> StockRecord:
     """
-    Get stock data and calculate distance from moving average.
+    Build a StockRecord object from the latest price and moving average.
 
     Args:
         symbol: Stock ticker symbol
-        ma_period: Moving average period (default: 150 days)
+        current_price: Latest closing price
+        current_ma: Moving average at the latest close
 
     Returns:
-        StockData object or None if error
+        StockRecord object with distance metrics rounded to 2 decimals
     """
-    try:
-        stock = yf.Ticker(symbol)
-        hist = stock.history(period=f"{ma_period + 30}d")
-
-        if len(hist) < ma_period:
-            return None
-
-        # Calculate MA
-        ma = hist['Close'].rolling(window=ma_period).mean()
-        current_price = hist['Close'].iloc[-1]
-        current_ma = ma.iloc[-1]
-
-        # Calculate distance
-        diff_percent = ((current_price - current_ma) / current_ma * 100)
-        distance_abs = abs(diff_percent)
-        direction = "ABOVE" if current_price > current_ma else "BELOW"
-        near_ma = distance_abs <= 5.0
-
-        return StockData(
-            symbol=symbol,
-            price=round(current_price, 2),
-            ma_150=round(current_ma, 2),
-            distance_percent=round(diff_percent, 2),
-            distance_abs=round(distance_abs, 2),
-            direction=direction,
-            near_ma=near_ma
-        )
-    except Exception as e:
-        print(f"Error fetching data for {symbol}: {e}")
-        return None
+    current_price = float(current_price)
+    current_ma = float(current_ma)
+
+    # Calculate distance
+    diff_percent = ((current_price - current_ma) / current_ma * 100)
+    distance_abs = abs(diff_percent)
+    direction = "ABOVE" if current_price > current_ma else "BELOW"
+    near_ma = distance_abs <= 5.0
+
+    return StockRecord(
+        symbol=symbol,
+        price=round(current_price, 2),
+        ma_150=round(current_ma, 2),
+        distance_percent=round(diff_percent, 2),
+        distance_abs=round(distance_abs, 2),
+        direction=direction,
+        near_ma=near_ma
+    )
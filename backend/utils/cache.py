@@ -1,21 +1,30 @@
 """Simple in-memory cache with TTL."""
 
-import time
-from typing import Optional, Any, Dict
+import threading
+from typing import Optional, Any, Tuple
+
+from cachetools import TLRUCache
+
+
+def _entry_expiry(key: str, entry: Tuple[Any, float], now: float) -> float:
+    """Expiry time for a cache entry stored as (value, ttl)."""
+    return now + entry[1]
 
 
 class SimpleCache:
-    """Simple in-memory cache with TTL support."""
+    """Thread-safe in-memory cache with per-key TTL expiry and an LRU size bound."""
 
-    def __init__(self, ttl: int = 3600):
+    def __init__(self, ttl: int = 3600, maxsize: int = 1024):
         """
         Initialize cache.
 
         Args:
-            ttl: Time-to-live in seconds (default: 3600 = 1 hour)
+            ttl: Default time-to-live in seconds (default: 3600 = 1 hour)
+            maxsize: Maximum number of entries before LRU eviction (default: 1024)
         """
         self.ttl = ttl
-        self._cache: Dict[str, tuple[Any, float]] = {}
+        self._cache: TLRUCache = TLRUCache(maxsize=maxsize, ttu=_entry_expiry)
+        self._lock = threading.RLock()
 
     def get(self, key: str) -> Optional[Any]:
         """
@@ -27,28 +36,26 @@ class SimpleCache:
         Returns:
             Cached value or None if expired/not found
         """
-        if key in self._cache:
-            value, timestamp = self._cache[key]
-            if time.time() - timestamp < self.ttl:
-                return value
-            else:
-                # Expired, remove from cache
-                del self._cache[key]
-        return None
-
-    def set(self, key: str, value: Any) -> None:
+        with self._lock:
+            entry = self._cache.get(key)
+        return entry[0] if entry is not None else None
+
+    def set(self, key: str, value: Any, ttl: Optional[int] = None) -> None:
         """
         Set value in cache.
 
         Args:
             key: Cache key
             value: Value to cache
+            ttl: Time-to-live in seconds for this key (default: cache-wide TTL)
         """
-        self._cache[key] = (value, time.time())
+        with self._lock:
+            self._cache[key] = (value, self.ttl if ttl is None else ttl)
 
     def clear(self) -> None:
         """Clear all cached values."""
-        self._cache.clear()
+        with self._lock:
+            self._cache.clear()
 
     def has(self, key: str) -> bool:
         """
@@ -60,8 +67,9 @@ class SimpleCache:
         Returns:
             True if key exists and not expired
         """
-        return self.get(key) is not None
+        with self._lock:
+            return key in self._cache
 
 
 # Global cache instance (1-hour TTL like Streamlit's @st.cache_data)
-stock_cache = SimpleCache(ttl=3600)
+stock_cache = SimpleCache(ttl=3600, maxsize=1024)
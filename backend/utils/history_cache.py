@@ -0,0 +1,84 @@
+"""On-disk cache for Yahoo Finance closing prices."""
+
+import hashlib
+import logging
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import List, Optional
+
+import pandas as pd
+
+
+logger = logging.getLogger(__name__)
+
+# Shared cache directory for data that should survive restarts
+CACHE_DIR = Path.home() / '.cache' / 'stocks_ma'
+
+
+class HistoryCache:
+    """File-based cache of closing prices keyed by ticker list and period."""
+
+    def __init__(self, directory: Path, expire_after: int = 900):
+        """
+        Initialize cache.
+
+        Args:
+            directory: Directory where cached price files are stored
+            expire_after: Time-to-live in seconds (default: 900 = 15 minutes)
+        """
+        self.directory = directory
+        self.expire_after = expire_after
+
+    def _path(self, symbols: List[str], period: str) -> Path:
+        """Build the cache file path for a ticker list and period."""
+        key = f"{period}:{','.join(symbols)}"
+        digest = hashlib.sha1(key.encode('utf-8')).hexdigest()
+        return self.directory / f"{digest}.csv"
+
+    def get(self, symbols: List[str], period: str,
+            max_age: Optional[float] = None) -> Optional[pd.DataFrame]:
+        """
+        Get closing prices from cache.
+
+        Args:
+            symbols: Ticker symbols requested together
+            period: History period passed to Yahoo Finance (e.g. "1y")
+            max_age: Maximum file age in seconds for this lookup (default: expire_after)
+
+        Returns:
+            DataFrame with one column per ticker, or None if expired/not found
+        """
+        path = self._path(symbols, period)
+        try:
+            expire_after = self.expire_after if max_age is None else max_age
+            if time.time() - path.stat().st_mtime >= expire_after:
+                return None
+            return pd.read_csv(path, index_col=0, parse_dates=True)
+        except (OSError, ValueError):
+            return None
+
+    def set(self, symbols: List[str], period: str, close_df: pd.DataFrame) -> None:
+        """
+        Store closing prices in cache.
+
+        Args:
+            symbols: Ticker symbols requested together
+            period: History period passed to Yahoo Finance (e.g. "1y")
+            close_df: DataFrame with one column per ticker
+        """
+        path = self._path(symbols, period)
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            # Write to a temp file first so concurrent readers never see a partial file
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+            with os.fdopen(fd, 'w') as f:
+                close_df.to_csv(f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning("Error writing history cache: %s", e)
+
+
+# Global cache instance (15-minute default TTL, survives process restarts)
+history_cache = HistoryCache(CACHE_DIR / 'history', expire_after=900)
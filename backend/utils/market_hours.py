@@ -0,0 +1,37 @@
+"""US equity market hours helper."""
+
+from datetime import datetime, time
+from typing import Optional
+from zoneinfo import ZoneInfo
+
+
+NYSE_TZ = ZoneInfo('America/New_York')
+NYSE_OPEN = time(9, 30)
+NYSE_CLOSE = time(16, 0)
+
+
+def market_open(now: Optional[datetime] = None) -> bool:
+    """
+    Check whether the NYSE regular session is currently open.
+
+    Exchange holidays are not accounted for, so a holiday weekday is
+    treated as a trading day.
+
+    Args:
+        now: Time to check (default: current time)
+
+    Returns:
+        True if `now` falls on a weekday between 9:30 and 16:00 New York time
+    """
+    now = datetime.now(NYSE_TZ) if now is None else now.astimezone(NYSE_TZ)
+    return now.weekday() < 5 and NYSE_OPEN <= now.time() < NYSE_CLOSE
+
+
+# Price data TTLs in seconds: quotes go stale fast while trading
+STOCKS_TTL_MARKET_OPEN = 60
+STOCKS_TTL_MARKET_CLOSED = 600
+
+
+def stocks_ttl() -> int:
+    """Get the cache TTL for stock data based on whether the market is open."""
+    return STOCKS_TTL_MARKET_OPEN if market_open() else STOCKS_TTL_MARKET_CLOSED
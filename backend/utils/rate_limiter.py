@@ -0,0 +1,89 @@
+"""Backoff-aware sliding-window rate limiter for Yahoo Finance requests."""
+
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+from typing import Deque
+
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimiter:
+    """
+    Thread-safe rate limiter that only paces requests after upstream rate-limits them.
+
+    Calls pass straight through until backoff() is called. While the backoff is in
+    effect, at most max_calls are allowed per (doubled) window.
+    """
+
+    def __init__(self, max_calls: int = 300, period: float = 60.0,
+                 backoff_seconds: float = 30.0, max_period: float = 600.0):
+        """
+        Initialize rate limiter.
+
+        Args:
+            max_calls: Maximum number of calls per period while backed off (default: 300)
+            period: Window length in seconds (default: 60)
+            backoff_seconds: How long a backoff stays in effect (default: 30)
+            max_period: Upper bound for the backed-off window length (default: 600)
+        """
+        self.max_calls = max_calls
+        self.base_period = period
+        self.period = period
+        self.backoff_seconds = backoff_seconds
+        self.max_period = max_period
+        self._calls: Deque[float] = deque()
+        self._backoff_until = 0.0
+        self._lock = threading.Lock()
+
+    async def acquire_async(self, calls: int = 1) -> None:
+        """
+        Record `calls` requests, first waiting without blocking the event loop if a
+        backoff is in effect and the window is full.
+
+        Args:
+            calls: Number of upstream requests about to be made (default: 1)
+        """
+        while (wait := self._try_acquire(calls)) > 0:
+            await asyncio.sleep(wait)
+
+    def _try_acquire(self, calls: int) -> float:
+        """
+        Record `calls` requests unless a backoff is in effect and they don't fit.
+
+        Args:
+            calls: Number of upstream requests about to be made
+
+        Returns:
+            0.0 if the calls were recorded, otherwise seconds to wait before retrying
+        """
+        calls = min(calls, self.max_calls)
+        with self._lock:
+            now = time.monotonic()
+            self._relax(now)
+
+            # Drop calls that have left the window
+            while self._calls and now - self._calls[0] >= self.period:
+                self._calls.popleft()
+
+            if now >= self._backoff_until or len(self._calls) + calls <= self.max_calls:
+                self._calls.extend([now] * calls)
+                return 0.0
+
+            # Never wait past the end of the backoff, when calls pass freely again
+            return min(self._calls[0] + self.period, self._backoff_until) - now
+
+    def backoff(self) -> None:
+        """Double the window length after a rate-limit response."""
+        with self._lock:
+            self.period = min(self.period * 2, self.max_period)
+            self._backoff_until = time.monotonic() + self.backoff_seconds
+            logger.warning("Rate limited by upstream: window increased to %.0fs", self.period)
+
+    def _relax(self, now: float) -> None:
+        """Restore the base window once the backoff has expired (lock must be held)."""
+        if self.period != self.base_period and now >= self._backoff_until:
+            self.period = self.base_period
@@ -1,12 +1,131 @@
 """Fetch S&P 500 ticker list from Wikipedia."""
 
-import pandas as pd
+import asyncio
+import json
+import logging
+import os
+import time
+import lxml.html
 import requests
-from typing import List
+from cachetools.func import ttl_cache
+from typing import List, Optional, Tuple
 
+from utils.history_cache import CACHE_DIR
 
-def get_sp500_tickers() -> List[str]:
-    """Fetch S&P 500 ticker list from Wikipedia and add custom ETFs and stocks."""
+
+logger = logging.getLogger(__name__)
+
+SP500_URL = 'https://en.wikipedia.org/wiki/List_of_S%26P_500_companies'
+SP500_CACHE_FILE = CACHE_DIR / 'sp500.json'
+SP500_CACHE_MAX_AGE = 86400  # Revalidate with Wikipedia once a day
+SP500_MIN_SYMBOLS = 400  # Fewer than this means the page layout changed
+SP500_RETRY_INTERVAL = 300  # How long a stale fallback list is served before retrying
+
+# Symbol links in the first column of the constituents table
+SP500_SYMBOL_XPATH = '(//table[contains(@class, "wikitable")])[1]//tr/td[1]/a/text()'
+
+# Yahoo uses '-' where Wikipedia uses '.' (e.g. BRK.B -> BRK-B)
+_TICKER_TR = str.maketrans('.', '-')
+
+
+def _read_sp500_cache() -> Optional[dict]:
+    """Load the cached {etag, last_modified, tickers, timestamp} record, if any."""
+    try:
+        with open(SP500_CACHE_FILE) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_sp500_cache(record: dict) -> None:
+    """Persist the {etag, last_modified, tickers, timestamp} record."""
+    try:
+        SP500_CACHE_FILE.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = SP500_CACHE_FILE.with_suffix('.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(record, f)
+        os.replace(tmp_path, SP500_CACHE_FILE)
+    except OSError as e:
+        logger.warning("Error writing S&P 500 cache: %s", e)
+
+
+@ttl_cache(maxsize=1, ttl=SP500_CACHE_MAX_AGE)
+def _fetch_fresh_sp500_symbols() -> List[str]:
+    """
+    Fetch S&P 500 symbols from Wikipedia using an on-disk ETag cache.
+
+    Cached symbols are returned as-is for a day; after that the page is
+    revalidated with If-None-Match/If-Modified-Since and only re-parsed when
+    it has changed. Failures raise, so only fresh results are memoized.
+
+    Returns:
+        List of S&P 500 ticker symbols with '.' replaced by '-'
+    """
+    cached = _read_sp500_cache()
+    if cached and time.time() - cached['timestamp'] < SP500_CACHE_MAX_AGE:
+        return cached['tickers']
+
+    # User-Agent header avoids a 403 from Wikipedia
+    headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'}
+    if cached and cached.get('etag'):
+        headers['If-None-Match'] = cached['etag']
+    if cached and cached.get('last_modified'):
+        headers['If-Modified-Since'] = cached['last_modified']
+
+    response = requests.get(SP500_URL, headers=headers, timeout=10)
+    if response.status_code == 304 and cached:
+        cached['timestamp'] = time.time()
+        _write_sp500_cache(cached)
+        return cached['tickers']
+    response.raise_for_status()
+
+    tree = lxml.html.fromstring(response.content)
+    # Clean up tickers (replace . with -)
+    tickers = [symbol.strip().translate(_TICKER_TR) for symbol in tree.xpath(SP500_SYMBOL_XPATH)]
+    if len(tickers) < SP500_MIN_SYMBOLS:
+        # Never cache a broken parse
+        raise ValueError(f"S&P 500 page parsed to only {len(tickers)} symbols")
+
+    _write_sp500_cache({
+        'etag': response.headers.get('ETag'),
+        'last_modified': response.headers.get('Last-Modified'),
+        'tickers': tickers,
+        'timestamp': time.time()
+    })
+    return tickers
+
+
+@ttl_cache(maxsize=1, ttl=SP500_RETRY_INTERVAL)
+def fetch_sp500_symbols() -> List[str]:
+    """
+    Fetch S&P 500 symbols, falling back to the last good list on failure.
+
+    A stale list served after a failed revalidation is only memoized for
+    SP500_RETRY_INTERVAL, so Wikipedia is retried soon after it recovers.
+    The result is memoized in-process, so callers must not mutate it.
+
+    Returns:
+        List of S&P 500 ticker symbols with '.' replaced by '-'
+    """
+    try:
+        return _fetch_fresh_sp500_symbols()
+    except (requests.RequestException, ValueError) as e:
+        # Serve a stale list rather than nothing when Wikipedia is unreachable or unparsable
+        cached = _read_sp500_cache()
+        if cached:
+            logger.warning("Error refreshing S&P 500 list (%s); serving cached list", e)
+            return cached['tickers']
+        raise
+
+
+def get_sp500_tickers_with_status() -> Tuple[List[str], bool]:
+    """
+    Fetch S&P 500 ticker list from Wikipedia and add custom ETFs and stocks.
+
+    Returns:
+        Tuple of (tickers, True if the S&P 500 list was fetched or False if
+        only the custom ETFs and stocks are returned)
+    """
 
     # Custom ETFs to monitor
     custom_etfs = [
@@ -30,22 +149,33 @@ def get_sp500_tickers() -> List[str]:
     ]
 
     try:
-        # Fetch S&P 500 stocks with User-Agent header to avoid 403 error
-        url = 'https://en.wikipedia.org/wiki/List_of_S%26P_500_companies'
-        headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'}
-        response = requests.get(url, headers=headers)
-        tables = pd.read_html(response.text)
-        sp500_table = tables[0]
-        tickers = sp500_table['Symbol'].tolist()
-
-        # Clean up tickers (replace . with -)
-        tickers = [ticker.replace('.', '-') for ticker in tickers]
+        tickers = fetch_sp500_symbols()
 
         # Add custom ETFs and stocks to the list
         all_tickers = tickers + custom_etfs + custom_stocks
 
-        return all_tickers
+        return all_tickers, True
     except Exception as e:
-        print(f"Error fetching S&P 500 list: {e}")
+        logger.warning("Error fetching S&P 500 list: %s", e)
         # If S&P 500 fetch fails, return just the ETFs and custom stocks
-        return custom_etfs + custom_stocks
+        return custom_etfs + custom_stocks, False
+
+
+def get_sp500_tickers() -> List[str]:
+    """Fetch S&P 500 ticker list from Wikipedia and add custom ETFs and stocks."""
+    return get_sp500_tickers_with_status()[0]
+
+
+# Serializes cold-cache fetches so concurrent requests share one Wikipedia call
+_sp500_lock = asyncio.Lock()
+
+
+async def get_sp500_tickers_with_status_async() -> Tuple[List[str], bool]:
+    """Get the ticker list and fetch status without blocking the event loop."""
+    async with _sp500_lock:
+        return await asyncio.to_thread(get_sp500_tickers_with_status)
+
+
+async def get_sp500_tickers_async() -> List[str]:
+    """Get the ticker list without blocking the event loop, coalescing concurrent calls."""
+    return (await get_sp500_tickers_with_status_async())[0]
@@ -6,99 +6,115 @@ This script is designed to run in GitHub Actions on a schedule.
 import os
 import sys
 import time
-import json
+import threading
+import orjson
+from dataclasses import asdict, dataclass
+from functools import lru_cache
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util import Retry
 from datetime import datetime
 from concurrent.futures import ThreadPoolExecutor, as_completed
-from typing import List, Optional
+from typing import List, Optional, Tuple
+from tenacity import retry, retry_if_exception, stop_after_attempt, wait_exponential
 
 # Add backend to path for imports
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
 
+import numpy as np
 import yfinance as yf
 import pandas as pd
 
+from services.stock_service import is_rate_limited
+from utils.sp500_fetcher import fetch_sp500_symbols
 
-# Pydantic-like data class (simplified for standalone script)
+
+# Shared HTTP session so JSONBin calls reuse one keep-alive TLS connection
+_SESSION = requests.Session()
+_SESSION.mount('https://', HTTPAdapter(
+    pool_connections=20,
+    pool_maxsize=20,
+    max_retries=Retry(total=3, backoff_factor=0.3,
+                      status_forcelist=[429, 500, 502, 503, 504],
+                      raise_on_status=False)
+))
+
+
+# Pydantic-like data class (simplified for standalone script); frozen so
+# memoized results can be shared safely
+@dataclass(frozen=True)
 class StockData:
-    def __init__(self, symbol, price, ma_150, distance_percent, distance_abs, direction, near_ma):
-        self.symbol = symbol
-        self.price = price
-        self.ma_150 = ma_150
-        self.distance_percent = distance_percent
-        self.distance_abs = distance_abs
-        self.direction = direction
-        self.near_ma = near_ma
+    symbol: str
+    price: float
+    ma_150: float
+    distance_percent: float
+    distance_abs: float
+    direction: str
+    near_ma: bool
 
     def to_dict(self):
-        return {
-            'symbol': self.symbol,
-            'price': self.price,
-            'ma_150': self.ma_150,
-            'distance_percent': self.distance_percent,
-            'distance_abs': self.distance_abs,
-            'direction': self.direction,
-            'near_ma': self.near_ma
-        }
+        return asdict(self)
 
 
-def get_sp500_tickers() -> List[str]:
-    """Fetch S&P 500 ticker list from Wikipedia and add custom ETFs."""
+# Major ETFs to include
+CUSTOM_ETFS = [
+    'SPY', 'QQQ', 'DIA', 'IWM', 'VTI', 'VOO',  # Market indexes
+    'XLF', 'XLK', 'XLE', 'XLV', 'XLI', 'XLY', 'XLP',  # Sectors
+    'VEA', 'VWO', 'EFA',  # International
+    'AGG', 'BND', 'TLT',  # Bonds
+    'GLD', 'SLV', 'NLR',  # Commodities/Others
+]
 
-    # Major ETFs to include
-    custom_etfs = [
-        'SPY', 'QQQ', 'DIA', 'IWM', 'VTI', 'VOO',  # Market indexes
-        'XLF', 'XLK', 'XLE', 'XLV', 'XLI', 'XLY', 'XLP',  # Sectors
-        'VEA', 'VWO', 'EFA',  # International
-        'AGG', 'BND', 'TLT',  # Bonds
-        'GLD', 'SLV', 'NLR',  # Commodities/Others
-    ]
-
-    # Popular individual stocks
-    custom_stocks = [
-        'TSLA', 'AAPL', 'AMZN', 'MSFT', 'GOOGL', 'META', 'NVDA',
-        'PLTR', 'NFLX', 'CEG', 'VST', 'AMD', 'INTC'
-    ]
+# Popular individual stocks
+CUSTOM_STOCKS = [
+    'TSLA', 'AAPL', 'AMZN', 'MSFT', 'GOOGL', 'META', 'NVDA',
+    'PLTR', 'NFLX', 'CEG', 'VST', 'AMD', 'INTC'
+]
 
-    try:
-        # Fetch S&P 500 stocks
-        url = 'https://en.wikipedia.org/wiki/List_of_S%26P_500_companies'
-        headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'}
-        response = requests.get(url, headers=headers, timeout=10)
-        response.raise_for_status()
+# Custom tickers deduplicated in listing order
+CUSTOM_TICKERS = list(dict.fromkeys(CUSTOM_ETFS + CUSTOM_STOCKS))
 
-        # Use StringIO to avoid file path issues
-        from io import StringIO
-        tables = pd.read_html(StringIO(response.text))
-        sp500_table = tables[0]
-        tickers = sp500_table['Symbol'].tolist()
 
-        # Clean up tickers
-        tickers = [ticker.replace('.', '-') for ticker in tickers]
+def get_sp500_tickers() -> List[str]:
+    """Fetch S&P 500 ticker list from Wikipedia and add custom ETFs."""
+    try:
+        # Fetch S&P 500 stocks (shares the backend's on-disk ETag cache)
+        tickers = fetch_sp500_symbols()
 
-        # Combine all
-        all_tickers = list(set(tickers + custom_etfs + custom_stocks))
+        # Combine all, dropping duplicates; sorted so every run batches the same way
+        all_tickers = sorted(dict.fromkeys(tickers + CUSTOM_TICKERS))
         print(f"Fetched {len(all_tickers)} unique tickers")
         return all_tickers
     except Exception as e:
         print(f"Error fetching S&P 500 list: {type(e).__name__}")
-        print(f"Falling back to custom ETFs and stocks only ({len(custom_etfs + custom_stocks)} tickers)")
-        return custom_etfs + custom_stocks
+        print(f"Falling back to custom ETFs and stocks only ({len(CUSTOM_TICKERS)} tickers)")
+        return list(CUSTOM_TICKERS)
+
 
+@retry(retry=retry_if_exception(is_rate_limited), wait=wait_exponential(min=1, max=60),
+       stop=stop_after_attempt(4), reraise=True)
+def fetch_history(symbol: str, period: str) -> pd.DataFrame:
+    """Fetch price history, backing off exponentially while Yahoo rate-limits us."""
+    return yf.Ticker(symbol).history(period=period)
 
+
+@lru_cache(maxsize=2048)
 def get_stock_ma_data(symbol: str, ma_period: int = 150) -> Optional[StockData]:
-    """Get stock data and calculate distance from moving average."""
+    """Get stock data and calculate distance from moving average.
+
+    Memoized per (symbol, ma_period) so duplicate tickers are fetched once
+    per run; call get_stock_ma_data.cache_clear() to start fresh.
+    """
     try:
-        stock = yf.Ticker(symbol)
-        hist = stock.history(period=f"{ma_period + 30}d")
+        hist = fetch_history(symbol, f"{ma_period + 30}d")
 
         if len(hist) < ma_period:
             return None
 
-        # Calculate MA
-        ma = hist['Close'].rolling(window=ma_period).mean()
-        current_price = hist['Close'].iloc[-1]
-        current_ma = ma.iloc[-1]
+        # Calculate MA over the last ma_period closes only
+        closes = hist['Close'].to_numpy()
+        current_price = closes[-1]
+        current_ma = closes[-ma_period:].mean()
 
         # Calculate distance
         diff_percent = ((current_price - current_ma) / current_ma * 100)
@@ -120,45 +136,114 @@ def get_stock_ma_data(symbol: str, ma_period: int = 150) -> Optional[StockData]:
         return None
 
 
-def fetch_stocks_parallel(tickers: List[str], max_workers: int = 10, batch_size: int = 50) -> List[dict]:
+def fetch_stocks_batched(tickers: List[str], ma_period: int = 150,
+                         chunk_size: int = 100) -> Tuple[List[dict], List[str]]:
+    """Fetch stock data with one yf.download request per chunk of tickers.
+
+    Returns the stock dicts plus the tickers that could not be computed from
+    the shared download (no data, short history or gaps in the MA window),
+    so they can be retried individually.
+    """
+    stocks_data = []
+    missing = []
+    total_tickers = len(tickers)
+
+    for chunk_start in range(0, total_tickers, chunk_size):
+        chunk_end = min(chunk_start + chunk_size, total_tickers)
+        chunk = tickers[chunk_start:chunk_end]
+
+        print(f"Downloading chunk {chunk_start//chunk_size + 1}: "
+              f"Tickers {chunk_start+1}-{chunk_end} of {total_tickers}")
+
+        try:
+            data = yf.download(chunk, period=f"{ma_period + 30}d", group_by='ticker',
+                               threads=True, progress=False)
+        except Exception as e:
+            print(f"Error downloading chunk: {e}")
+            missing.extend(chunk)
+            continue
+
+        # Wide frame of closing prices, one column per ticker
+        downloaded = set(data.columns.get_level_values(0)) if not data.empty else set()
+        close = pd.DataFrame({t: data[t]['Close'] for t in chunk if t in downloaded})
+        close = close.dropna(axis=1, how='all').dropna(how='all')
+        missing.extend(t for t in chunk if t not in close.columns)
+
+        if len(close) < ma_period:
+            # Too little shared history; let the per-ticker retry decide
+            missing.extend(close.columns)
+            continue
+
+        # Calculate MA for every column in one NumPy reduction
+        window = close.tail(ma_period).to_numpy(dtype=np.float64)
+        current_ma = window.mean(axis=0)
+        current_price = window[-1]
+        diff_percent = (current_price - current_ma) / current_ma * 100.0
+        # Gaps in the shared window would skew the MA; fetch those tickers on their own
+        valid = ~np.isnan(current_ma) & ~np.isnan(current_price)
+        missing.extend(close.columns[~valid])
+
+        above = current_price[valid] > current_ma[valid]
+        near_ma = np.abs(diff_percent[valid]) <= 5.0
+        prices = np.round(current_price[valid], 2)
+        mas = np.round(current_ma[valid], 2)
+        diffs = np.round(diff_percent[valid], 2)
+
+        stocks_data.extend(
+            StockData(
+                symbol=symbol,
+                price=float(price),
+                ma_150=float(ma),
+                distance_percent=float(diff),
+                distance_abs=abs(float(diff)),
+                direction="ABOVE" if up else "BELOW",
+                near_ma=bool(near)
+            ).to_dict()
+            for symbol, price, ma, diff, up, near in zip(
+                close.columns[valid], prices, mas, diffs, above, near_ma
+            )
+        )
+
+    print(f"Batched download returned {len(stocks_data)} stocks, "
+          f"{len(missing)} tickers to retry individually")
+    return stocks_data, missing
+
+
+def fetch_stocks_parallel(tickers: List[str], max_workers: int = 10) -> List[dict]:
     """Fetch stock data in parallel using ThreadPoolExecutor."""
     stocks_data = []
     total_tickers = len(tickers)
 
-    # Process in batches for rate limiting
-    for batch_start in range(0, total_tickers, batch_size):
-        batch_end = min(batch_start + batch_size, total_tickers)
-        batch = tickers[batch_start:batch_end]
-
-        print(f"Processing batch {batch_start//batch_size + 1}: "
-              f"Tickers {batch_start+1}-{batch_end} of {total_tickers}")
-
-        # Use ThreadPoolExecutor for parallel processing
-        with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            future_to_ticker = {
-                executor.submit(get_stock_ma_data, ticker): ticker
-                for ticker in batch
-            }
-
-            for future in as_completed(future_to_ticker):
-                ticker = future_to_ticker[future]
-                try:
-                    result = future.result()
-                    if result:
-                        stocks_data.append(result.to_dict())
-                except Exception as e:
-                    print(f"Error processing {ticker}: {e}")
-
-        # Rate limiting: sleep 1 second after each batch
-        if batch_end < total_tickers:
-            print(f"Rate limiting: sleeping 1 second...")
-            time.sleep(1)
+    # Bound in-flight work so submission waits while all workers are busy
+    slots = threading.BoundedSemaphore(max_workers * 2)
+    future_to_ticker = {}
+
+    # One pool for the whole run; rate limiting is handled by fetch_history's backoff
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for i, ticker in enumerate(tickers, start=1):
+            slots.acquire()
+            future = executor.submit(get_stock_ma_data, ticker)
+            future.add_done_callback(lambda _: slots.release())
+            future_to_ticker[future] = ticker
+
+            if i % 50 == 0:
+                print(f"Submitted {i} of {total_tickers} tickers")
+
+        for future in as_completed(future_to_ticker):
+            ticker = future_to_ticker[future]
+            try:
+                result = future.result()
+                if result:
+                    stocks_data.append(result.to_dict())
+            except Exception as e:
+                print(f"Error processing {ticker}: {e}")
 
     print(f"Successfully processed {len(stocks_data)} stocks out of {total_tickers}")
     return stocks_data
 
 
-def upload_to_jsonbin(data: dict, api_key: str, bin_id: str):
+def upload_to_jsonbin(data: dict, api_key: str, bin_id: str,
+                      session: requests.Session = _SESSION):
     """Upload data to JSONBin.io."""
     url = f"https://api.jsonbin.io/v3/b/{bin_id}"
     headers = {
@@ -167,19 +252,18 @@ def upload_to_jsonbin(data: dict, api_key: str, bin_id: str):
     }
 
     try:
-        # Calculate payload size
-        payload_str = json.dumps(data)
-        payload_size = len(payload_str.encode('utf-8'))
-        print(f"Payload size: {payload_size / 1024:.2f} KB ({len(data['stocks'])} stocks)")
+        # Serialize once with orjson; the same bytes are measured and sent
+        body = orjson.dumps(data)
+        print(f"Payload size: {len(body) / 1024:.2f} KB ({len(data['stocks'])} stocks)")
 
-        response = requests.put(url, json=data, headers=headers, timeout=30)
+        response = session.put(url, data=body, headers=headers, timeout=30)
         print(f"Response status: {response.status_code}")
         print(f"Response body: {response.text[:500]}")
         response.raise_for_status()
 
         # Verify upload by checking what's in the bin
         verify_url = f"https://api.jsonbin.io/v3/b/{bin_id}/latest"
-        verify_response = requests.get(verify_url, headers={'X-Master-Key': api_key})
+        verify_response = session.get(verify_url, headers={'X-Master-Key': api_key}, timeout=30)
         verify_data = verify_response.json()
         actual_count = len(verify_data.get('record', {}).get('stocks', []))
         print(f"Verification: JSONBin now has {actual_count} stocks")
@@ -200,7 +284,13 @@ def main():
     print("=" * 60)
     print("Stock Data Fetcher - GitHub Actions")
     print("=" * 60)
-    print(f"Started at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S UTC')}")
+    # Take the timestamp once so the banner, metadata and summary agree
+    started = datetime.now()
+    started_str = started.strftime('%Y-%m-%d %H:%M:%S UTC')
+    print(f"Started at: {started_str}")
+
+    # Never reuse per-ticker results from an earlier run in the same process
+    get_stock_ma_data.cache_clear()
 
     # Get environment variables
     api_key = os.environ.get('JSONBIN_API_KEY')
@@ -215,19 +305,24 @@ def main():
     print("\nFetching ticker list...")
     tickers = get_sp500_tickers()
 
-    # Fetch stock data with parallel processing
-    print(f"\nFetching data for {len(tickers)} stocks with parallel processing...")
+    # Fetch stock data with batched downloads, retrying missing tickers one by one
+    print(f"\nFetching data for {len(tickers)} stocks with batched downloads...")
     start_time = time.time()
-    stocks_data = fetch_stocks_parallel(tickers, max_workers=10, batch_size=50)
+    stocks_data, missing = fetch_stocks_batched(tickers)
+    if missing:
+        print(f"\nRetrying {len(missing)} tickers individually...")
+        stocks_data += fetch_stocks_parallel(missing, max_workers=10)
     processing_time = time.time() - start_time
 
     print(f"\nProcessing completed in {processing_time:.2f} seconds")
     print(f"Successfully fetched {len(stocks_data)} stocks")
 
-    # Calculate statistics
-    near_ma = sum(1 for s in stocks_data if s['near_ma'])
-    above = sum(1 for s in stocks_data if s['direction'] == 'ABOVE')
-    below = sum(1 for s in stocks_data if s['direction'] == 'BELOW')
+    # Calculate statistics (explicit columns keep this working for an empty result)
+    stats = pd.DataFrame.from_records(stocks_data, columns=['near_ma', 'direction'])
+    direction_counts = stats['direction'].value_counts()
+    near_ma = int(stats['near_ma'].sum())
+    above = int(direction_counts.get('ABOVE', 0))
+    below = int(direction_counts.get('BELOW', 0))
 
     # Prepare data for upload
     upload_data = {
@@ -238,7 +333,7 @@ def main():
             'above_count': above,
             'below_count': below,
             'processing_time': round(processing_time, 2),
-            'last_updated': datetime.now().isoformat(),
+            'last_updated': started.isoformat(),
             'version': '1.0.0'
         }
     }
@@ -250,7 +345,7 @@ def main():
     # Write summary file for GitHub Actions artifact
     summary = f"""Stock Data Update Summary
 ========================
-Date: {datetime.now().strftime('%Y-%m-%d %H:%M:%S UTC')}
+Date: {started_str}
 Total Stocks Processed: {len(stocks_data)}
 Processing Time: {processing_time:.2f} seconds
 Near MA (±5%): {near_ma}